@@ -1,5 +1,7 @@
 """ Declares the classes for objects related to pyfreedbutil. """
 
+from typing import Optional
+
 from numpy import uint32  # unsigned 32-bit integer
 
 from . import discid_lib
@@ -74,11 +76,12 @@ class AudioTrackGroup:
     """Collection of several tracks"""
 
     # Fields
-    tracks: list[AudioTrack] = []
+    tracks: list[AudioTrack]
 
     # init
-    def __init__(self, tracks: list[AudioTrack] = []) -> None:
-        self.tracks = tracks  # may be constructed from a list of tracks
+    def __init__(self, tracks: Optional[list[AudioTrack]] = None) -> None:
+        # may be constructed from a list of tracks, copied so instances never share one
+        self.tracks = list(tracks) if tracks else []
 
     # Methods
     def __str__(self) -> str:
@@ -113,14 +116,14 @@ class AudioAlbum(AudioTrackGroup):
     """An audio album, which is a collection of tracks with a title and an artist."""
 
     # Fields
-    tracks: list[AudioTrack] = []
+    tracks: list[AudioTrack]
     title: str = ""
     artist: str = ""
 
     def __init__(
         self,
-        tracks: list[AudioTrack] = [],
-        audio_track_group: AudioTrackGroup = AudioTrackGroup(),
+        tracks: Optional[list[AudioTrack]] = None,
+        audio_track_group: Optional[AudioTrackGroup] = None,
         title: str = "",
         artists: str = "",
         year: str = "",
@@ -137,8 +140,10 @@ class AudioAlbum(AudioTrackGroup):
             genre (str): The genre of the album."""
         if tracks:
             super().__init__(tracks=tracks)  # construct form tracks
-        else:
+        elif audio_track_group is not None:
             super().__init__(audio_track_group.tracks)  # construct form AudioTrackGroup
+        else:
+            super().__init__()
         self.title = title
         self.artist = artists
         self.year = year
@@ -1,7 +1,20 @@
 """ Tools to query freedb servers. """
 
+import asyncio
+import concurrent.futures
+import errno
+import heapq
+import http.client
+import ipaddress
+import itertools
+import os
 import re
-from typing import Any, Literal, Union
+import select
+import socket
+import threading
+import time
+import weakref
+from typing import Any, Iterable, Iterator, Literal, Optional, Union
 from urllib import request
 
 from . import freedblib_info
@@ -38,7 +51,7 @@ class Freedb_Query:
 
     def __init__(
         self,
-        album: AudioAlbum = AudioAlbum(),
+        album: Optional[AudioAlbum] = None,
         disc_id: str = "",
         query_type: Union[Literal["query"], Literal["read"]] = "query",
         category: freedblib_info.FREEDB_CATEGORIES_TYPES = "rock",
@@ -63,7 +76,7 @@ class Freedb_Query:
             protocol (int, optional): The protocol version. Defaults to DEFAULT_PROTOCOL.
             query_type (str, Literal["query"] or Literal["read"]). Query type. Defaults to "query".
         """
-        self.album = album
+        self.album = album if album is not None else AudioAlbum()
         self.disc_id = disc_id
         self.user = user
         self.user_email = user_email
@@ -152,12 +165,13 @@ class Freedb_Query_Generator:
         self.category: freedblib_info.FREEDB_CATEGORIES_TYPES = category
 
     def generate_query(
-        self, album: AudioAlbum = AudioAlbum(), disc_id: str = ""
+        self, album: Optional[AudioAlbum] = None, disc_id: str = ""
     ) -> Freedb_Query:
         """Generates a Freedb_Query with the given album.
 
         Args:
-            album (AudioAlbum): The album to query for.
+            album (AudioAlbum, optional): The album to query for. Defaults to a new empty AudioAlbum.
+            disc_id (str, optional): The disc id.
 
         Returns:
             Freedb_Query: The generated query."""
@@ -347,45 +361,642 @@ class Freedb_Query_Read_Reader:
         return error_code, album
 
 
+class Freedb_Deadline_Exceeded(TimeoutError):
+    """Raised when the time budget of a Freedb_Deadline has run out."""
+
+
+class Freedb_Cancelled(Exception):
+    """Raised when a Freedb_Deadline has been cancelled."""
+
+
+class Freedb_Server_Error(Exception):
+    """Raised when a freedb server answers with an error status code."""
+
+    def __init__(self, error_code: str, header: str = "") -> None:
+        if error_code:
+            super().__init__(f"Server error {error_code}: {header.strip()}")
+        else:  # no status code to report
+            super().__init__(header.strip() or "Invalid response from the server")
+        self.error_code = error_code
+        self.header = header
+
+
+class _Deadline_Watchdog:
+    """A single thread aborting the requests in flight of every expired Freedb_Deadline."""
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._heap: list[tuple[float, int, weakref.ref]] = []  # (expires_at, seq, deadline)
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, deadline: "Freedb_Deadline") -> None:
+        with self._condition:
+            heapq.heappush(
+                self._heap, (deadline.expires_at, next(self._seq), weakref.ref(deadline))
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="Freedb_Deadline_Watchdog", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                expired: list[Freedb_Deadline] = []
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, ref = heapq.heappop(self._heap)
+                    deadline = ref()
+                    if deadline is not None and not deadline._closed:
+                        expired.append(deadline)
+                if not expired:
+                    self._condition.wait(self._heap[0][0] - now if self._heap else None)
+                    continue
+            for deadline in expired:
+                deadline._abort_in_flight()
+
+
+_watchdog = _Deadline_Watchdog()
+
+
+class Freedb_Deadline:
+    """A time budget shared by every request of a query->read resolution.
+
+    The socket timeout of each request is derived from the time remaining. When the
+    budget runs out, or when cancel() is called from any thread, the requests in
+    flight are aborted, including those still connecting.
+
+    May be used as a context manager, which closes it on exit."""
+
+    def __init__(self, budget: float) -> None:
+        """Initialize the deadline.
+
+        Args:
+            budget (float): The total time budget, in seconds.
+        """
+        if budget <= 0:
+            raise ValueError(f"budget should be positive, got budget={budget}.")
+        self._start(time.monotonic() + budget)
+
+    def _start(self, expires_at: float) -> None:
+        self.expires_at = expires_at
+        self._cancelled = threading.Event()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._in_flight: set[socket.socket] = set()
+        self._children: "weakref.WeakSet[Freedb_Deadline]" = weakref.WeakSet()
+        _watchdog.watch(self)  # aborts the requests still in flight once the budget has run out
+
+    def __enter__(self) -> "Freedb_Deadline":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def remaining(self) -> float:
+        """Returns the time remaining in seconds, 0 if expired."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Whether the time budget has run out."""
+        return self.remaining() <= 0
+
+    def cancelled(self) -> bool:
+        """Whether cancel() has been called, on this deadline or on its parent."""
+        return self._cancelled.is_set()
+
+    def check(self) -> None:
+        """Raises Freedb_Cancelled or Freedb_Deadline_Exceeded if the resolution must stop."""
+        if self.cancelled():
+            raise Freedb_Cancelled("The deadline has been cancelled.")
+        if self.expired():
+            raise Freedb_Deadline_Exceeded("The deadline has been exceeded.")
+
+    def timeout(self, shares: int = 1, max_timeout: Optional[float] = None) -> float:
+        """Returns the socket timeout for the next request.
+
+        Args:
+            shares (int, optional): The number of requests (including the next one) the remaining time is split between. Defaults to 1.
+            max_timeout (float, optional): Upper bound for the timeout. Defaults to None (no bound).
+
+        Returns:
+            float: The timeout, in seconds.
+        """
+        self.check()
+        timeout = self.remaining() / max(1, shares)
+        if max_timeout is not None:
+            timeout = min(timeout, max_timeout)
+        return timeout
+
+    def child(self) -> "Freedb_Deadline":
+        """Returns a deadline expiring with this one and cancelled with it, which can be
+        cancelled on its own without cancelling this one."""
+        child = Freedb_Deadline.__new__(Freedb_Deadline)
+        child._start(self.expires_at)
+        with self._lock:
+            self._children.add(child)
+        if self.cancelled():
+            child.cancel()
+        return child
+
+    def cancel(self) -> None:
+        """Cancels the deadline and its children, and aborts the requests in flight. Thread-safe."""
+        self._cancelled.set()
+        self._abort_in_flight()
+        with self._lock:
+            children = list(self._children)
+        for child in children:
+            child.cancel()
+
+    def close(self) -> None:
+        """Stops watching the expiry. Requests sent afterwards still get their socket
+        timeout from the time remaining, but are not aborted when it runs out."""
+        self._closed = True
+
+    def _abort_in_flight(self) -> None:
+        with self._lock:
+            in_flight = list(self._in_flight)
+        for sock in in_flight:
+            _abort_socket(sock)
+
+    def _register(self, sock: socket.socket) -> None:
+        """Tracks a socket so that cancel() and expiry can abort it."""
+        with self._lock:
+            self._in_flight.add(sock)
+        if self.cancelled() or self.expired():  # stopped while connecting
+            _abort_socket(sock)
+
+    def _unregister(self, sock: socket.socket) -> None:
+        with self._lock:
+            self._in_flight.discard(sock)
+
+
+_POLL_INTERVAL = 0.05  # seconds between deadline checks while resolving and connecting
+
+
+def _abort_socket(sock: socket.socket) -> None:
+    """Aborts a socket from another thread, unblocking a pending recv()."""
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:  # already closed, or not connected yet
+        pass
+
+
+def _getaddrinfo(host: str, port: int, deadline: Freedb_Deadline) -> list[Any]:
+    """socket.getaddrinfo(), given up on when the deadline stops."""
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        pass
+    else:  # nothing to resolve
+        return socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+
+    # the lookup can't be interrupted: run it aside and stop waiting for it
+    result: list[Any] = []
+    done = threading.Event()
+
+    def lookup() -> None:
+        try:
+            result.append(socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM))
+        except OSError as e:
+            result.append(e)
+        finally:
+            done.set()
+
+    threading.Thread(target=lookup, daemon=True).start()
+    while not done.wait(_POLL_INTERVAL):
+        deadline.check()
+    if isinstance(result[0], OSError):
+        raise result[0]
+    return result[0]
+
+
+def _connect(
+    sock: socket.socket, address: Any, timeout: Any, deadline: Freedb_Deadline
+) -> None:
+    """sock.connect(), checking the deadline between polls so that it can be aborted."""
+    if not isinstance(timeout, (int, float)):  # socket._GLOBAL_DEFAULT_TIMEOUT
+        timeout = None
+    stop = deadline.expires_at if timeout is None else time.monotonic() + timeout
+
+    sock.setblocking(False)
+    error = sock.connect_ex(address)
+    while error in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY):
+        deadline.check()
+        wait = min(_POLL_INTERVAL, stop - time.monotonic())
+        if wait <= 0:
+            raise socket.timeout("timed out")
+        _, writable, errored = select.select([], [sock], [sock], wait)
+        if writable or errored:
+            error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+    if error:
+        raise OSError(error, os.strerror(error))
+    deadline.check()
+    sock.settimeout(timeout)
+
+
+class _Deadline_Connection_Mixin:
+    """Registers the sockets of an http.client connection with a Freedb_Deadline,
+    before connecting, so that the connection can be aborted at any point."""
+
+    deadline: Freedb_Deadline
+    sockets: list[socket.socket]
+
+    def connect(self) -> None:
+        self._create_connection = self._deadline_create_connection
+        super().connect()  # type: ignore
+        if self.sock not in self.sockets:  # type: ignore  # wrapped by ssl
+            self.sockets.append(self.sock)  # type: ignore
+            self.deadline._register(self.sock)  # type: ignore
+
+    def _deadline_create_connection(
+        self, address: tuple[str, int], timeout: Any, source_address: Any = None
+    ) -> socket.socket:
+        host, port = address
+        last_error: Optional[OSError] = None
+        for family, socktype, proto, _, sockaddr in _getaddrinfo(host, port, self.deadline):
+            sock = socket.socket(family, socktype, proto)
+            self.sockets.append(sock)
+            self.deadline._register(sock)
+            try:
+                if source_address:
+                    sock.bind(source_address)
+                _connect(sock, sockaddr, timeout, self.deadline)
+                return sock
+            except (Freedb_Cancelled, Freedb_Deadline_Exceeded):
+                sock.close()
+                raise
+            except OSError as e:
+                sock.close()
+                last_error = e  # try the next address
+        raise last_error or OSError("getaddrinfo returned an empty list")
+
+
+class _Deadline_HTTPConnection(_Deadline_Connection_Mixin, http.client.HTTPConnection):
+    pass
+
+
+class _Deadline_HTTPSConnection(_Deadline_Connection_Mixin, http.client.HTTPSConnection):
+    pass
+
+
+class _Deadline_HTTPHandler(request.HTTPHandler):
+    def __init__(self, deadline: Freedb_Deadline, sockets: list[socket.socket]) -> None:
+        super().__init__()
+        self.deadline = deadline
+        self.sockets = sockets
+
+    def http_open(self, req: request.Request) -> Any:
+        return self.do_open(self._connection, req)
+
+    def _connection(self, host: str, **kwargs: Any) -> http.client.HTTPConnection:
+        conn = _Deadline_HTTPConnection(host, **kwargs)
+        conn.deadline = self.deadline
+        conn.sockets = self.sockets
+        return conn
+
+
+class _Deadline_HTTPSHandler(request.HTTPSHandler):
+    def __init__(self, deadline: Freedb_Deadline, sockets: list[socket.socket]) -> None:
+        super().__init__()
+        self.deadline = deadline
+        self.sockets = sockets
+
+    def https_open(self, req: request.Request) -> Any:
+        return self.do_open(self._connection, req)
+
+    def _connection(self, host: str, **kwargs: Any) -> http.client.HTTPSConnection:
+        conn = _Deadline_HTTPSConnection(host, **kwargs)
+        conn.deadline = self.deadline
+        conn.sockets = self.sockets
+        return conn
+
+
+class _Freedb_Results(Iterator[tuple[int, list[bytes]]]):
+    """The iterator returned by Freedb_Server.query_many().
+
+    Unlike a generator, close() also stops the queries when no result has been read yet."""
+
+    def __init__(
+        self,
+        executor: concurrent.futures.ThreadPoolExecutor,
+        futures: dict[concurrent.futures.Future, int],
+        mode: Union[Literal["ordered"], Literal["as_completed"]],
+        deadline: Optional[Freedb_Deadline],
+    ) -> None:
+        """deadline is the child deadline of query_many(), None if none was given."""
+        self._executor = executor
+        self._futures = futures
+        self._deadline = deadline
+        self._finished = False
+        if mode == "ordered":
+            self._done: Iterator[concurrent.futures.Future] = iter(futures)
+        else:
+            self._done = concurrent.futures.as_completed(futures)
+
+    def __iter__(self) -> "_Freedb_Results":
+        return self
+
+    def __next__(self) -> tuple[int, list[bytes]]:
+        if self._finished:
+            raise StopIteration
+        try:
+            future = next(self._done)
+            return self._futures[future], future.result()
+        except StopIteration:
+            self._finish()
+            raise
+        except BaseException:  # a query failed, or the consumer was interrupted
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Stops the queries: the queued ones are skipped, the ones in flight are aborted if a deadline was given."""
+        if self._finished:
+            return
+        self._finish()  # skips the queued queries first, so no worker picks one up
+        if self._deadline is not None:
+            self._deadline.cancel()
+
+    def _finish(self) -> None:
+        self._finished = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._deadline is not None:
+            self._deadline.close()
+
+
 class Freedb_Server:
     """A class to query a freedb server."""
 
-    headers: dict[str, str] = {}
+    headers: dict[str, str]
 
     def __init__(
         self,
-        headers: dict[str, str] = {"User-Agent": freedblib_info.USER_AGENT},
+        headers: Optional[dict[str, str]] = None,
         freedb_server: str = freedblib_info.CDDB_SERVERS[0],
+        fallback_servers: Optional[list[str]] = None,
+        timeout: float = freedblib_info.DEFAULT_TIMEOUT,
     ) -> None:
         """Initialize the server.
 
         Args:
             headers (dict[str, str], optional): The headers to send with the query.
             freedb_server (str, optional): The url of the server. Defaults to CDDB_SERVERS[0].
+            fallback_servers (list[str], optional): The urls to fail over to when resolving. Defaults to the other CDDB_SERVERS.
+            timeout (float, optional): The socket timeout of a single request, in seconds. Defaults to DEFAULT_TIMEOUT.
 
         headers defaults to {"User-Agent":"Mozilla/4.0 (compatible; MSIE 7.0; Windows NT 5.1)"}, cueTools' default user-agent.
         """
-        self.headers = headers
+        if headers is None:
+            headers = {"User-Agent": freedblib_info.USER_AGENT}
+        self.headers = dict(headers)  # copied so instances never share one
         self.freedb_server = freedb_server
-
-    def query(self, query: Freedb_Query) -> list[bytes]:
+        if fallback_servers is None:
+            fallback_servers = [
+                server for server in freedblib_info.CDDB_SERVERS if server != freedb_server
+            ]
+        self.fallback_servers = list(fallback_servers)
+        self.timeout = timeout
+
+    def query(
+        self,
+        query: Freedb_Query,
+        deadline: Optional[Freedb_Deadline] = None,
+        timeout: Optional[float] = None,
+        freedb_server: Optional[str] = None,
+    ) -> list[bytes]:
         """Sends a query to the server and returns the result (response.readlines()).
 
         Args:
             query (Freedb_Query): The query to send.
+            deadline (Freedb_Deadline, optional): The deadline the query must complete within. Defaults to None.
+            timeout (float, optional): The socket timeout, in seconds. Defaults to the time remaining on the deadline, bounded by self.timeout.
+            freedb_server (str, optional): The url of the server to send to. Defaults to self.freedb_server.
 
         Returns:
             list[bytes]: The result of the query, such as result.readlines().
+
+        Raises:
+            Freedb_Deadline_Exceeded: If the deadline ran out before the query completed.
+            Freedb_Cancelled: If the deadline was cancelled before the query completed.
         """
+        if timeout is None:
+            if deadline is not None:
+                timeout = deadline.timeout(max_timeout=self.timeout)
+            else:
+                timeout = self.timeout
 
         req = request.Request(
-            url=query.get_query_string(self.freedb_server),
+            url=query.get_query_string(freedb_server or self.freedb_server),
             headers=self.headers,
         )
 
-        with request.urlopen(url=req) as response:
-            lines = response.readlines()
-            return lines
+        if deadline is None:
+            with request.urlopen(url=req, timeout=timeout) as response:
+                lines = response.readlines()
+                return lines
+
+        # the sockets are registered with the deadline as soon as they connect,
+        # so that expiry and cancel() abort the headers and the body alike
+        sockets: list[socket.socket] = []
+        opener = request.build_opener(
+            _Deadline_HTTPHandler(deadline, sockets),
+            _Deadline_HTTPSHandler(deadline, sockets),
+        )
+        try:
+            with opener.open(req, timeout=timeout) as response:
+                lines = response.readlines()
+        except Exception:
+            deadline.check()  # report cancellation and expiry rather than the socket error
+            raise
+        finally:
+            for sock in sockets:
+                deadline._unregister(sock)
+        deadline.check()  # an aborted read may return truncated lines
+        return lines
+
+    def query_with_failover(
+        self, query: Freedb_Query, deadline: Freedb_Deadline, pending: int = 1
+    ) -> list[bytes]:
+        """Sends a query, retrying on the fallback servers, within the deadline.
+
+        The first attempt gets the time remaining, less a reserve for the requests
+        still to come. After a failure, what is left is split between the remaining
+        attempts and those requests. A server answering with an error status code
+        (other than 401, entry not found) counts as a failure.
+
+        Args:
+            query (Freedb_Query): The query to send.
+            deadline (Freedb_Deadline): The deadline shared by the whole resolution.
+            pending (int, optional): The number of requests still to send, including this one. Defaults to 1.
+
+        Returns:
+            list[bytes]: The result of the query, such as result.readlines().
+
+        Raises:
+            Freedb_Deadline_Exceeded: If the deadline ran out before the query completed.
+            Freedb_Cancelled: If the deadline was cancelled before the query completed.
+            Freedb_Server_Error: If every server answered with an error status code.
+            OSError: If every server failed, the error of the last one.
+        """
+        servers = [self.freedb_server] + self.fallback_servers
+        attempts = servers * (freedblib_info.DEFAULT_RETRIES + 1)
+
+        last_error: Optional[BaseException] = None
+        for i, server in enumerate(attempts):
+            if i == 0:
+                shares = pending
+            else:
+                shares = len(attempts) - i + pending - 1
+            timeout = deadline.timeout(shares=shares, max_timeout=self.timeout)
+            try:
+                lines = self.query(
+                    query, deadline=deadline, timeout=timeout, freedb_server=server
+                )
+                if not lines:
+                    raise Freedb_Server_Error("", "Empty response from the server")
+                header, error_code = Freedb_Query_Query_Reader().get_header_error_code(
+                    lines
+                )
+                if error_code[:1] in ("4", "5") and error_code != "401":
+                    raise Freedb_Server_Error(error_code, header)
+                return lines
+            except (Freedb_Cancelled, Freedb_Deadline_Exceeded):
+                raise
+            except (OSError, http.client.HTTPException, Freedb_Server_Error) as e:
+                last_error = e  # try the next server
+        if deadline.expired():
+            raise Freedb_Deadline_Exceeded("The deadline has been exceeded.") from last_error
+        assert last_error is not None
+        raise last_error
+
+    def resolve(
+        self, query: Freedb_Query, deadline: Freedb_Deadline
+    ) -> list[AudioAlbum]:
+        """Sends a "query"-type query, then a "read" for every match, within the deadline.
+
+        Args:
+            query (Freedb_Query): The "query"-type query to send.
+            deadline (Freedb_Deadline): The deadline shared by the query, the reads, the retries and the failover.
+
+        Returns:
+            list[AudioAlbum]: The albums read. Empty if none matched. Matches whose read is not found (401) are skipped.
+
+        Raises:
+            Freedb_Deadline_Exceeded: If the deadline ran out before the resolution completed.
+            Freedb_Cancelled: If the deadline was cancelled before the resolution completed.
+            Freedb_Server_Error: If every server answered with an error status code.
+        """
+        # the query and at least one read
+        query_result = self.query_with_failover(query, deadline, pending=2)
+        query_reader = Freedb_Query_Query_Reader()
+        header, error_code = query_reader.get_header_error_code(query_result)
+        if error_code == "202":  # no match
+            return []
+        elif error_code == "200":  # exact match, given in the header
+            header = header.replace("\r", "").replace("\n", "")
+            match = query_reader.re_quadruplets.match(header[4:])
+            quadruplets = [match.groups()] if match else []
+        elif error_code in ("210", "211"):  # exact or inexact matches
+            _, quadruplets = query_reader.get_query_quadruplets(query_result)
+        else:
+            raise Freedb_Server_Error(error_code, header)
+
+        read_reader = Freedb_Query_Read_Reader()
+        albums: list[AudioAlbum] = []
+        for i, (category, disc_id, _, _) in enumerate(quadruplets):
+            read = Freedb_Query(
+                disc_id=disc_id,
+                query_type="read",
+                category=category,  # type: ignore
+                user=query.user,
+                user_email=query.user_email,
+                host=query.host,
+                app=query.app,
+                version=query.version,
+                protocol=query.protocol,
+            )
+            read_result = self.query_with_failover(
+                read, deadline, pending=len(quadruplets) - i
+            )
+            error_code, album = read_reader.get_read_releases(read_result)
+            if error_code != "210":  # entry not found
+                continue
+            albums.append(album)
+        return albums
+
+    async def resolve_async(
+        self, query: Freedb_Query, deadline: Freedb_Deadline
+    ) -> list[AudioAlbum]:
+        """Like resolve(), for asyncio. Cancelling the task cancels the deadline,
+        which aborts the requests in flight.
+
+        Args:
+            query (Freedb_Query): The "query"-type query to send.
+            deadline (Freedb_Deadline): The deadline shared by the whole resolution.
+
+        Returns:
+            list[AudioAlbum]: The albums read. Empty if none matched.
+        """
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(self.resolve, query, deadline),
+                timeout=deadline.remaining(),
+            )
+        except (Freedb_Deadline_Exceeded, Freedb_Cancelled):
+            raise  # from resolve(), asyncio.TimeoutError would catch them on 3.11+
+        except asyncio.TimeoutError as e:
+            deadline.cancel()
+            raise Freedb_Deadline_Exceeded("The deadline has been exceeded.") from e
+        except asyncio.CancelledError:
+            deadline.cancel()
+            raise
+
+    def query_many(
+        self,
+        queries: Iterable[Freedb_Query],
+        max_workers: int = 4,
+        mode: Union[Literal["ordered"], Literal["as_completed"]] = "ordered",
+        deadline: Optional[Freedb_Deadline] = None,
+    ) -> Iterator[tuple[int, list[bytes]]]:
+        """Sends several queries on a thread pool, for callers that can't use asyncio.
+
+        The queries are submitted right away; the results are read from the returned iterator.
+
+        Args:
+            queries (Iterable[Freedb_Query]): The queries to send.
+            max_workers (int, optional): The number of worker threads. Defaults to 4.
+            mode (str, Literal["ordered"] or Literal["as_completed"]): Yield the results in the order of the queries, or as soon as they complete. Defaults to "ordered".
+            deadline (Freedb_Deadline, optional): The deadline shared by all the queries. Defaults to None.
+
+        Returns:
+            Iterator[tuple[int, list[bytes]]]: The index of each query and its result, such as result.readlines().
+
+        The first query to fail raises its exception, and the queries not yet started are cancelled.
+        If a deadline is given, the queries run under a child of it, which is cancelled when a query
+        fails or the iterator is closed early: the requests in flight are aborted, and the caller's
+        deadline is left untouched. Without a deadline they run until their socket timeout.
+        """
+        if mode not in ("ordered", "as_completed"):
+            raise ValueError(f"Invalid mode {mode}.")
+
+        if deadline is not None:
+            deadline = deadline.child()  # cancelled on its own when stopping early
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {
+                executor.submit(self.query, query, deadline): i
+                for i, query in enumerate(queries)
+            }
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if deadline is not None:
+                deadline.cancel()
+            raise
+        return _Freedb_Results(executor, futures, mode, deadline)
 
     def query_result_str(self, query_result: list[bytes], encoding="utf-8") -> str:
         """Converts the result of a query to a string.
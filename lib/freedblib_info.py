@@ -8,6 +8,8 @@ DEFAULT_HOST = "pyfreedbutil_instance1"
 DEFAULT_APP = "pyfreedbutil"
 DEFAULT_VERSION = "0.0.5"
 DEFAULT_PROTOCOL = "5"
+DEFAULT_TIMEOUT = 10.0  # seconds, per request, when no deadline is given
+DEFAULT_RETRIES = 1  # extra rounds over the servers when resolving
 
 CDDB_SERVERS = [
     "http://gnudb.gnudb.org/~cddb/cddb.cgi",
@@ -0,0 +1,92 @@
+""" Shared fixtures: local http servers standing in for freedb servers. """
+
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+QUERY_RESPONSE = b"210 Found exact matches, list follows (until terminating `.')\r\nrock 0a000102 Test Artist / Test Album\r\n.\r\n"
+READ_RESPONSE = b"210 rock 0a000102 CD database entry follows (until terminating `.')\r\nDISCID=0a000102\r\nDTITLE=Test Artist / Test Album\r\nDYEAR=2000\r\nDGENRE=Rock\r\nTTITLE0=Track 1\r\nTTITLE1=Track 2\r\n.\r\n"
+
+
+def get_cmd(handler: BaseHTTPRequestHandler) -> str:
+    """Returns the cddb command of a request, such as "cddb query ..."."""
+    return parse_qs(urlparse(handler.path).query)["cmd"][0]
+
+
+def send_body(handler: BaseHTTPRequestHandler, body: bytes) -> None:
+    handler.send_response(200)
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def cddb(handler: BaseHTTPRequestHandler) -> None:
+    """Answers like a healthy freedb server with one match."""
+    if get_cmd(handler).startswith("cddb query"):
+        send_body(handler, QUERY_RESPONSE)
+    else:
+        send_body(handler, READ_RESPONSE)
+
+
+@pytest.fixture
+def http_server():
+    """Starts local http servers. Call with a handle(handler) function, returns the url."""
+    servers: list[ThreadingHTTPServer] = []
+
+    def start(handle: Callable[[BaseHTTPRequestHandler], None]) -> str:
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                try:
+                    handle(self)
+                except OSError:  # the client aborted
+                    pass
+
+            def log_message(self, *args) -> None:
+                pass
+
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        httpd.daemon_threads = True
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return f"http://127.0.0.1:{httpd.server_port}/cddb.cgi"
+
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def refused_url() -> str:
+    """An url on which connections are refused."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return f"http://127.0.0.1:{port}/cddb.cgi"
+
+
+@pytest.fixture
+def stalled_url():
+    """An url on which connections stall: the listener's backlog is full and never accepted."""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(0)
+    port = listener.getsockname()[1]
+    backlog: list[socket.socket] = []
+    for _ in range(8):
+        sock = socket.socket()
+        sock.setblocking(False)
+        sock.connect_ex(("127.0.0.1", port))
+        backlog.append(sock)
+    yield f"http://127.0.0.1:{port}/cddb.cgi"
+    for sock in backlog:
+        sock.close()
+    listener.close()
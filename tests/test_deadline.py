@@ -0,0 +1,227 @@
+""" Tests for Freedb_Deadline and the query->read resolution of Freedb_Server. """
+
+import asyncio
+import threading
+import time
+from urllib.error import URLError
+
+import pytest
+from conftest import QUERY_RESPONSE, cddb, get_cmd, send_body
+
+from lib.freedb_Objects import AudioAlbum, AudioTrack
+from lib.freedb_query_lib import (
+    Freedb_Cancelled,
+    Freedb_Deadline,
+    Freedb_Deadline_Exceeded,
+    Freedb_Query,
+    Freedb_Server,
+    Freedb_Server_Error,
+)
+
+
+def make_query() -> Freedb_Query:
+    return Freedb_Query(album=AudioAlbum([AudioTrack(1000), AudioTrack(2000)]))
+
+
+TRICKLE_DURATION = 5.0  # seconds a slow server takes to answer
+# generous bounds: a request that is not aborted takes TRICKLE_DURATION
+ABORT_BOUND = TRICKLE_DURATION / 2
+
+
+def trickle(handler) -> None:
+    """Answers with one line every 100 ms, for TRICKLE_DURATION."""
+    handler.send_response(200)
+    handler.end_headers()
+    handler.wfile.write(QUERY_RESPONSE.splitlines(keepends=True)[0])
+    for _ in range(int(TRICKLE_DURATION / 0.1)):
+        handler.wfile.write(b"rock 0a000102 Test Artist / Test Album\r\n")
+        handler.wfile.flush()
+        time.sleep(0.1)
+    handler.wfile.write(b".\r\n")
+
+
+def test_resolve(http_server):
+    server = Freedb_Server(freedb_server=http_server(cddb), fallback_servers=[])
+    albums = server.resolve(make_query(), Freedb_Deadline(5))
+    assert len(albums) == 1
+    assert albums[0].title == "Test Artist / Test Album"
+    assert [track.title for track in albums[0].tracks] == ["Track 1", "Track 2"]
+
+
+def test_expiry_aborts_slow_server(http_server):
+    url = http_server(trickle)
+    server = Freedb_Server(freedb_server=url, fallback_servers=[url])
+    start = time.monotonic()
+    with pytest.raises(Freedb_Deadline_Exceeded):
+        server.resolve(make_query(), Freedb_Deadline(1.0))
+    assert time.monotonic() - start < ABORT_BOUND
+
+
+def test_expiry_aborts_slow_headers(http_server):
+    def slow_headers(handler):
+        handler.wfile.write(b"HTTP/1.0 200 OK\r\n")
+        for _ in range(int(TRICKLE_DURATION / 0.1)):
+            handler.wfile.write(b"X-Slow: 1\r\n")
+            handler.wfile.flush()
+            time.sleep(0.1)
+
+    server = Freedb_Server(freedb_server=http_server(slow_headers), fallback_servers=[])
+    start = time.monotonic()
+    with pytest.raises(Freedb_Deadline_Exceeded):
+        server.resolve(make_query(), Freedb_Deadline(1.0))
+    assert time.monotonic() - start < ABORT_BOUND
+
+
+def test_cancel_from_thread_during_read(http_server):
+    server = Freedb_Server(freedb_server=http_server(trickle), fallback_servers=[])
+    deadline = Freedb_Deadline(10)
+    threading.Timer(0.3, deadline.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(Freedb_Cancelled):
+        server.resolve(make_query(), deadline)
+    assert time.monotonic() - start < ABORT_BOUND
+
+
+def test_cancel_during_connect(stalled_url):
+    server = Freedb_Server(
+        freedb_server=stalled_url, fallback_servers=[], timeout=TRICKLE_DURATION
+    )
+    deadline = Freedb_Deadline(10)
+    threading.Timer(0.3, deadline.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(Freedb_Cancelled):
+        server.resolve(make_query(), deadline)
+    assert time.monotonic() - start < ABORT_BOUND
+
+
+def test_expiry_during_connect(stalled_url):
+    server = Freedb_Server(freedb_server=stalled_url, fallback_servers=[])
+    start = time.monotonic()
+    with pytest.raises(Freedb_Deadline_Exceeded):
+        # a socket timeout longer than the budget: only the expiry can stop the connect
+        server.query(make_query(), Freedb_Deadline(1.0), timeout=2 * TRICKLE_DURATION)
+    assert time.monotonic() - start < ABORT_BOUND
+
+
+def test_deadlines_share_one_thread():
+    Freedb_Deadline(60)  # starts the watchdog if needed
+    threads = threading.active_count()
+    deadlines = [Freedb_Deadline(60) for _ in range(200)]
+    assert threading.active_count() == threads
+    del deadlines
+
+
+def test_context_manager_closes():
+    with Freedb_Deadline(60) as deadline:
+        assert not deadline._closed
+    assert deadline._closed
+
+
+def test_child_deadline():
+    parent = Freedb_Deadline(60)
+    child = parent.child()
+    assert child.expires_at == parent.expires_at
+    child.cancel()
+    assert not parent.cancelled()
+    other = parent.child()
+    parent.cancel()
+    assert other.cancelled()
+
+
+def test_cancel_asyncio_task(http_server):
+    server = Freedb_Server(freedb_server=http_server(trickle), fallback_servers=[])
+    deadline = Freedb_Deadline(10)
+
+    async def main():
+        task = asyncio.create_task(server.resolve_async(make_query(), deadline))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.monotonic()
+    asyncio.run(main())
+    assert deadline.cancelled()
+    assert time.monotonic() - start < ABORT_BOUND
+
+
+def test_resolve_async_keeps_deadline_exceeded(monkeypatch):
+    server = Freedb_Server()
+    error = Freedb_Deadline_Exceeded("raised by resolve")
+
+    def resolve(query, deadline):
+        raise error
+
+    monkeypatch.setattr(server, "resolve", resolve)
+    with pytest.raises(Freedb_Deadline_Exceeded) as excinfo:
+        asyncio.run(server.resolve_async(make_query(), Freedb_Deadline(5)))
+    assert excinfo.value is error
+
+
+def test_failover_on_refused_connection(http_server, refused_url):
+    server = Freedb_Server(freedb_server=refused_url, fallback_servers=[http_server(cddb)])
+    assert len(server.resolve(make_query(), Freedb_Deadline(5))) == 1
+
+
+def test_failover_on_server_error(http_server):
+    def error(handler):
+        send_body(handler, b"500 Internal server error\r\n")
+
+    server = Freedb_Server(
+        freedb_server=http_server(error), fallback_servers=[http_server(cddb)]
+    )
+    assert len(server.resolve(make_query(), Freedb_Deadline(5))) == 1
+
+
+def test_refused_connection_is_not_deadline_exceeded(refused_url):
+    server = Freedb_Server(freedb_server=refused_url, fallback_servers=[refused_url])
+    with pytest.raises(URLError):
+        server.resolve(make_query(), Freedb_Deadline(5))
+
+
+def test_server_error_is_raised(http_server):
+    def error(handler):
+        send_body(handler, b"403 Database entry is corrupt\r\n")
+
+    server = Freedb_Server(freedb_server=http_server(error), fallback_servers=[])
+    with pytest.raises(Freedb_Server_Error) as excinfo:
+        server.resolve(make_query(), Freedb_Deadline(5))
+    assert excinfo.value.error_code == "403"
+
+
+def test_first_attempt_gets_most_of_the_budget(http_server):
+    def slow(handler):
+        time.sleep(0.6)
+        cddb(handler)
+
+    server = Freedb_Server(freedb_server=http_server(slow), fallback_servers=[])
+    # split between 2 servers x 2 rounds + 1 read, the query would get 0.4 s
+    assert len(server.resolve(make_query(), Freedb_Deadline(2.0))) == 1
+
+
+def test_empty_response_message(http_server):
+    def empty(handler):
+        send_body(handler, b"")
+
+    server = Freedb_Server(freedb_server=http_server(empty), fallback_servers=[])
+    with pytest.raises(Freedb_Server_Error, match="^Empty response from the server$"):
+        server.resolve(make_query(), Freedb_Deadline(5))
+
+
+def test_no_match(http_server):
+    def no_match(handler):
+        send_body(handler, b"202 No match found\r\n")
+
+    server = Freedb_Server(freedb_server=http_server(no_match), fallback_servers=[])
+    assert server.resolve(make_query(), Freedb_Deadline(5)) == []
+
+
+def test_read_not_found_is_skipped(http_server):
+    def not_found(handler):
+        if get_cmd(handler).startswith("cddb query"):
+            send_body(handler, QUERY_RESPONSE)
+        else:
+            send_body(handler, b"401 rock 0a000102 No such CD entry in database\r\n")
+
+    server = Freedb_Server(freedb_server=http_server(not_found), fallback_servers=[])
+    assert server.resolve(make_query(), Freedb_Deadline(5)) == []
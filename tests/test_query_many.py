@@ -0,0 +1,123 @@
+""" Stress tests for Freedb_Server.query_many against serial queries. """
+
+import random
+import threading
+import time
+
+import pytest
+from conftest import send_body
+
+from lib.freedb_Objects import AudioAlbum, AudioTrack
+from lib.freedb_query_lib import (
+    Freedb_Deadline,
+    Freedb_Query_Generator,
+    Freedb_Server,
+)
+
+QUERY_COUNT = 300
+
+
+def echo(handler) -> None:
+    """Answers with the request path after a random delay, so that completions interleave."""
+    time.sleep(random.random() * 0.01)
+    send_body(handler, f"210 ok\r\n{handler.path}\r\n.\r\n".encode())
+
+
+@pytest.fixture
+def queries():
+    rng = random.Random(0)
+    generator = Freedb_Query_Generator()  # shared by every query
+    return [
+        generator.generate_query(
+            AudioAlbum([AudioTrack(rng.randint(100, 9000)) for _ in range(rng.randint(1, 12))])
+        )
+        for _ in range(QUERY_COUNT)
+    ]
+
+
+@pytest.mark.parametrize("mode", ["ordered", "as_completed"])
+def test_query_many_matches_serial(http_server, queries, mode):
+    server = Freedb_Server(freedb_server=http_server(echo))
+    serial = [server.query(query) for query in queries]
+
+    results = list(server.query_many(queries, max_workers=16, mode=mode))
+
+    assert len(results) == QUERY_COUNT
+    if mode == "ordered":
+        assert [i for i, _ in results] == list(range(QUERY_COUNT))
+    assert sorted(results) == list(enumerate(serial))
+
+
+def test_query_many_invalid_mode():
+    with pytest.raises(ValueError):
+        Freedb_Server().query_many([], mode="bogus")  # type: ignore
+
+
+SLOW_DURATION = 5.0  # seconds a slow request takes when it is not aborted
+
+
+class Recording_Server(Freedb_Server):
+    """Records when each query is sent and when it ends."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.sent: list[float] = []
+        self.ended: list[float] = []
+
+    def query(self, query, deadline=None, timeout=None, freedb_server=None):
+        self.sent.append(time.monotonic())
+        try:
+            return super().query(query, deadline, timeout, freedb_server)
+        finally:
+            self.ended.append(time.monotonic())
+
+
+@pytest.mark.parametrize("read_first", [False, True])
+def test_query_many_early_stop_aborts_in_flight(http_server, queries, read_first):
+    def slow(handler):
+        if "first" in handler.path:
+            echo(handler)
+        else:
+            time.sleep(SLOW_DURATION)
+            echo(handler)
+
+    fast_url = http_server(slow) + "?first="
+    server = Recording_Server(freedb_server=http_server(slow))
+    deadline = Freedb_Deadline(60)
+    results = server.query_many(queries, max_workers=4, deadline=deadline)
+    if read_first:
+        next(results)
+    time.sleep(0.5)  # the workers are now blocked on the slow server
+
+    start = time.monotonic()
+    results.close()
+    assert time.monotonic() - start < SLOW_DURATION / 2
+    while len(server.ended) < len(server.sent) and time.monotonic() - start < SLOW_DURATION:
+        time.sleep(0.05)
+    # the requests in flight were aborted, the queued ones never sent
+    assert len(server.ended) == len(server.sent)
+    assert max(server.ended) - start < SLOW_DURATION / 2
+    assert len(server.sent) < QUERY_COUNT / 10
+
+    # the caller's deadline is not cancelled, and still usable
+    assert not deadline.cancelled()
+    fast = Freedb_Server(freedb_server=fast_url)
+    assert fast.query(queries[0], deadline)
+
+
+def test_query_many_from_several_threads(http_server, queries):
+    server = Freedb_Server(freedb_server=http_server(echo))
+    serial = [server.query(query) for query in queries]
+    outputs: list[list] = [[] for _ in range(4)]
+
+    def run(output):
+        output.extend(server.query_many(queries, max_workers=4))
+
+    threads = [threading.Thread(target=run, args=(output,)) for output in outputs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for output in outputs:
+        assert output == list(enumerate(serial))